@@ -18,14 +18,28 @@ Before launching the simulation with NgSpice.run() they must be registered like:
 Whenever ngspice encounters an external source it will call a function that will look into
 a dictionary of user-defined functions, find it by name, and evaluate it at the corresponding time.
 
+If the function also accepts numpy arrays, register it with vectorized=True:
+
+  ng.add_external_source('va0', custom_generator, vectorized=True)
+
+lyngspice will then evaluate it once over the time grid of the .tran analysis (by default with 10 points
+per time step, see the oversample argument) and ngspice will read from this table instead of calling
+back into Python at every time point.
+
 This example creates a 4-bit R-2R DAC network ( https://en.wikipedia.org/wiki/Resistor_ladder )
 and simulates it with a 100kHz tone. generate_bit_generator() is used to generate the user-defined
-function for each bit of the ladder. The results are then plotted.
+function for each bit of the ladder. If numba is installed, these functions are compiled into native
+ufuncs that work with both scalars and arrays, so each call from ngspice skips the Python-level numpy
+overhead. The results are then plotted.
 """
 
 from matplotlib import pyplot as plt
 import numpy as np
 from lyngspice import NgSpice
+try:
+  from numba import vectorize
+except ImportError:
+  vectorize = None
 
 N = 4   # Number of bits for the DAC
 R = 50  # Base resistor value (largely irrelevant in this ideal case)
@@ -33,20 +47,28 @@ R = 50  # Base resistor value (largely irrelevant in this ideal case)
 # Returns a function bit_generator(t) that generates a square wave [0, V0]
 # This wave is the n-th control bit in a N-bit DAC producing a cosine function at 'freq' Hz
 def generate_bit_generator(N, n, freq, V0):
+  w = 2*np.pi*freq
+  scale = ((2.0**N)-1.0)/2.0
+  weight = 2**n
   def bit_generator(t):
-    x = np.cos(2*np.pi*freq*t)
-    xq = np.round((x+1.0)*((2.0**N)-1.0)/2.0)   # Scale amplitude between 0 and 2**(N-1) and quantize it
-    xqn = (xq//(2**n)) % 2                      # Take the n-th bit
+    x = np.cos(w*t)
+    xq = np.round((x+1.0)*scale)    # Scale amplitude between 0 and 2**(N-1) and quantize it
+    xqn = (xq//weight) % 2          # Take the n-th bit
     return xqn * V0    
+  if vectorize is not None:
+    return vectorize(['float64(float64)'])(bit_generator)
   return bit_generator  
 
+# Series resistors of the ladder: 2R for the termination at the LSB, R for the rest
+R_series = [2*R] + [R]*(N-1)
+
 ng = NgSpice()
 netlist = ['R-2R network with external sources']
 for n in range(N):
-  netlist.append('r%d_0 %d %d %f' % (n, n+1, n, (1+(n==0))*R))
+  netlist.append('r%d_0 %d %d %f' % (n, n+1, n, R_series[n]))
   netlist.append('r%d_1 a%d %d %f' % (n, n, n+1, 2*R))
   netlist.append('va%d a%d %d dc 0 external' % (n, n, 0))
-  ng.add_external_source('va%d' % n, generate_bit_generator(N, n, 100e3, 1.0))
+  ng.add_external_source('va%d' % n, generate_bit_generator(N, n, 100e3, 1.0), vectorized=True)
   
 netlist += [
     '.tran 10n 20u',
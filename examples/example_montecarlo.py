@@ -4,9 +4,15 @@
 This example generates a netlist as a function of three parameters: two resistances and once capacitance.
 The resulting circuit is a non-inverting amplifier with a low-pass capacitor
 
-This function is called Nmc times to perform an AC analysis and obtain its gain versus frequency for random
+This netlist is simulated Nmc times with an AC analysis to obtain its gain versus frequency for random
 values of r1, r2 and c2 around the central values R1, R2 and C2, introducing small variations with a standard
-deviation of 5%. After every 10 simulations the library is reset with ng.reset() to avoid memory leaks.
+deviation of 5%. The netlist (including opamp_model.cir) is loaded and parsed only once, and every run
+just changes the values of r2, r1 and c2 in place with ng.alter(). After every simulation its results are
+freed with ng.clear_plots() so they don't pile up in memory, keeping the library and circuit loaded.
+
+Since every sample is independent, the simulations are distributed over a pool of processes. ngspice's
+shared library is stateful and can't be shared between threads, but each worker process loads its own
+copy through its own NgSpice instance, which is created once and reused for all the samples it handles.
 
 All transfer functions are plotted together on the first figure, with the random distribution of the DC gain
 represented as a histogram on the second figure.
@@ -14,12 +20,16 @@ represented as a histogram on the second figure.
 
 """
 
+import os
+import multiprocessing as mp
 from matplotlib import pyplot as plt
 import numpy as np
 from lyngspice import NgSpice
 
+_DB_PER_NEPER = 20.0/np.log(10.0)  # 20*log10(x) == (20/ln(10))*ln(x)
+
 def dB(x):
-  return 20*np.log10(np.abs(x))
+  return _DB_PER_NEPER*np.log(np.abs(x))
 
 def netlist_non_inverting_lowpass(r2, r1, c2):
   return [
@@ -40,49 +50,59 @@ R2 = 100e3 # 100kOhm
 R1 = 100e3 # 100kOHm
 C2 = 1e-12 # 1pF
 
-ng = NgSpice()
-
-
-data,_ = ng.run(netlist_non_inverting_lowpass(r2=R2, r1=R1, c2=C2))
-ac = data.ac1
-freq = ac['frequency']
-
-plt.figure()
-Gdc = np.zeros(Nmc)
-for n in range(Nmc):
-  r2_tol, r1_tol, c2_tol = np.random.normal(1, 0.05, 3) # Return three gaussian random variables of mean=1 and stdvar=0.05
-  
-  data,_ = ng.run(netlist_non_inverting_lowpass(r2=R2*r2_tol, r1=R1*r1_tol, c2=C2*c2_tol))
-  
+# One NgSpice instance per worker process, created by init_worker() and reused across samples
+ng = None
+
+def init_worker():
+  global ng
+  ng = NgSpice()
+  ng.load_netlist(netlist_non_inverting_lowpass(r2=R2, r1=R1, c2=C2))
+
+def simulate(tols):
+  r2_tol, r1_tol, c2_tol = tols
+  ng.alter('r2', R2*r2_tol)
+  ng.alter('r1', R1*r1_tol)
+  ng.alter('c2', C2*c2_tol)
+  # Only 'frequency' and 'out' are needed, so let the rest of the vectors be skipped with lazy=True
+  data,_ = ng.run(lazy=True)
   
   ac = data.ac1
   freq = ac['frequency']
   gain = dB(ac['out'])
-  Gdc[n] = gain[0]
-  plt.semilogx(freq, gain, 'r-', linewidth=0.5)
-  
-  if not n%10:
-    print('%f%%' % (100*n/Nmc))
-    # Flush memory every now and then to prevent leaks
-    ng.reset()
   
-plt.xticks([1e3, 1e4, 1e5, 1e6, 1e7], ['1k', '10k', '100k', '1M', '10M'])
-plt.title('AC gain across %d samples' % Nmc)
-plt.xlabel('Frequency [Hz]')
-plt.ylabel('Gain [dB]')
-plt.grid()
-plt.draw()
-plt.savefig('ac_gain.png')
-
-plt.figure()
-plt.hist(Gdc, bins=20)
-plt.title('DC gain distribution')
-plt.xlabel('DC gain [dB]')
-plt.ylabel('# of samples')
-plt.grid()
-plt.draw()
-plt.savefig('dc_gain.png')
-
-
-plt.show()
+  # Free this run's vectors (freq and gain are already copies)
+  ng.clear_plots()
+  return freq, gain
 
+if __name__ == '__main__':
+  tols = np.random.normal(1, 0.05, (Nmc, 3)) # Gaussian random variables of mean=1 and stdvar=0.05 for r2, r1, c2
+  
+  plt.figure()
+  Gdc = np.zeros(Nmc)
+  with mp.Pool(processes=os.cpu_count(), initializer=init_worker) as pool:
+    for n, (freq, gain) in enumerate(pool.imap(simulate, tols, chunksize=10)):
+      Gdc[n] = gain[0]
+      plt.semilogx(freq, gain, 'r-', linewidth=0.5)
+      
+      if not n%10:
+        print('%f%%' % (100*n/Nmc))
+    
+  plt.xticks([1e3, 1e4, 1e5, 1e6, 1e7], ['1k', '10k', '100k', '1M', '10M'])
+  plt.title('AC gain across %d samples' % Nmc)
+  plt.xlabel('Frequency [Hz]')
+  plt.ylabel('Gain [dB]')
+  plt.grid()
+  plt.draw()
+  plt.savefig('ac_gain.png')
+  
+  plt.figure()
+  plt.hist(Gdc, bins=20)
+  plt.title('DC gain distribution')
+  plt.xlabel('DC gain [dB]')
+  plt.ylabel('# of samples')
+  plt.grid()
+  plt.draw()
+  plt.savefig('dc_gain.png')
+  
+  
+  plt.show()
@@ -65,14 +65,12 @@ Results are returned as simple dictionaries. See the examples for extra tips.
 import platform
 import os.path
 import sys
+import keyword
 import numpy as np
-# Compatibility Python 2/3 for Queue library
-try:
-	from Queue import Queue
-except ImportError:
-	from queue import Queue
+from collections import deque
+from collections.abc import MutableMapping
 from ctypes import c_char_p, c_void_p, c_int, c_short, c_double, c_bool, Structure
-from ctypes import cast, pointer, POINTER, CFUNCTYPE, py_object
+from ctypes import cast, pointer, memmove, sizeof, POINTER, CFUNCTYPE, py_object
 try:
   from ctypes import windll as dll
   from _ctypes import FreeLibrary as dlclose
@@ -88,6 +86,14 @@ _LIB_PATHS = {
     'FreeBSD' :   ['/usr/local/lib/libngspice.so']
     }
 
+_RUNNING_OS = platform.system()
+_LIB_LOADERS = {
+    'Windows' : dll.LoadLibrary,
+    'Linux'   : dll.LoadLibrary,
+    'FreeBSD' : dll.LoadLibrary
+    }
+_lib_path = None  # Found by the first NgSpice() and reused by the following ones
+
 _encoding = 'iso8859_15'
 
 _UNITS = [
@@ -139,6 +145,65 @@ _TYPE = [
         'db',
         'capacitance',
         'charge']
+# (units, type) pairs indexed by ngspice's vector type, built once so get_data() only does one lookup
+_UNIT_TYPE = tuple(zip(_UNITS, _TYPE))
+
+_SCALE_FACTORS = {
+        't'   : 1e12,
+        'g'   : 1e9,
+        'meg' : 1e6,
+        'k'   : 1e3,
+        'mil' : 25.4e-6,
+        'm'   : 1e-3,
+        'u'   : 1e-6,
+        'n'   : 1e-9,
+        'p'   : 1e-12,
+        'f'   : 1e-15
+        }
+
+# Convert a spice number such as '10n', '1.5meg' or '2e-6s' into a float
+def _spice_float(s):
+  s = s.lower()
+  i = len(s)
+  while i and not (s[i-1].isdigit() or s[i-1]=='.'):
+    i -= 1
+  value, suffix = float(s[:i]), s[i:]
+  for factor in ('meg', 'mil', 't', 'g', 'k', 'm', 'u', 'n', 'p', 'f'):
+    if suffix.startswith(factor):
+      return value*_SCALE_FACTORS[factor]
+  return value
+
+# Return (tstep, tstop) from the first .tran directive in a netlist, or None if there isn't any
+def _parse_tran(netlist):
+  for line in netlist:
+    fields = line.split()
+    if len(fields) >= 3 and fields[0].lower() == '.tran':
+      try:
+        return _spice_float(fields[1]), _spice_float(fields[2])
+      except ValueError:
+        return None
+  return None
+
+# Largest table precomputed for a vectorized external source (80MB of float64)
+_MAX_CACHE_SAMPLES = 10**7
+
+_LINESEP = os.linesep.encode(_encoding)
+
+def _encode_line(line):
+  return line.encode(_encoding) + _LINESEP
+
+# Iterate over a NULL-terminated char** returned by ngspice, reading every entry only once
+def _iter_cstr_array(p):
+  if not p:
+    return
+  i = 0
+  while True:
+    s = p[i]
+    if s is None:
+      return
+    yield s
+    i += 1
+
 # ########################################### DATA TYPES ###################################################### #
 
 class ngcomplex_t(Structure):
@@ -186,13 +251,149 @@ class VecValuesAll(Structure):
                 ('vecsa', POINTER(POINTER(VecValues))) # values of actual set of vectors, indexed from 0 to veccount − 1
                 ] 
 
-class Dataset(dict):
-  def __init__(self, *args, **kwargs):
-    super(Dataset, self).__init__(*args, **kwargs)
-    self.__dict__.update(self)
+# Netlist encoded once as a NULL-terminated char* array, ready to be passed to ngSpice_Circ.
+# Element values can be overridden on every load without re-encoding the rest of the lines
+class CompiledNetlist(object):
+  def __init__(self, netlist):
+    self.lines = list(netlist)
+    self.tran = _parse_tran(self.lines)
+    self._encoded = [_encode_line(line) for line in self.lines]
+    self.c_netlist = (c_char_p*(len(self._encoded)+1))(*(self._encoded + [None]))
+    # Index the elements of the top level only, leaving out subcircuit definitions and .control blocks
+    self._elements = {}
+    depth = 0
+    for i, line in enumerate(self.lines[1:], 1):
+      fields = line.split()
+      if not fields:
+        continue
+      card = fields[0].lower()
+      if card in ('.subckt', '.control'):
+        depth += 1
+      elif card in ('.ends', '.endc'):
+        depth -= 1
+      elif depth == 0 and card[0] not in '.*+':
+        self._elements[card] = i
+  
+  # Replace the value of a resistor, capacitor or inductor (e.g. 'r2 out 1 100k') by a number or a string.
+  # Other elements don't keep their value in a fixed field, so they are rejected
+  def _override(self, name, value):
+    try:
+      i = self._elements[name.lower()]
+    except KeyError:
+      sys.stderr.write('Element \'%s\' not found in the top level of the compiled netlist\n' % name)
+      raise
+    fields = self.lines[i].split()
+    if fields[0][0].lower() not in 'rcl':
+      sys.stderr.write('Only resistors, capacitors and inductors can be overridden, not \'%s\'\n' % name)
+      raise ValueError
+    if len(fields) < 4:
+      sys.stderr.write('Element \'%s\' has no value to override: %s\n' % (name, self.lines[i]))
+      raise ValueError
+    fields[3] = value if isinstance(value, str) else '%e' % value
+    self.c_netlist[i] = _encode_line(' '.join(fields))
+    return i
+  
+  def _restore(self, i):
+    self.c_netlist[i] = self._encoded[i]
+
+# Convert the (name, flags, length, address) of an ngspice vector into a numpy array
+def _vector_to_array(vector_info, copy):
+  name, flags, length, address = vector_info
+  if flags & 0b1:    # NgSpice.is_real()
+    if copy:
+      z = np.empty(length, dtype=np.float64)
+      memmove(z.ctypes.data, address, sizeof(c_double)*length)
+    else:
+      z = np.frombuffer((c_double*length).from_address(address), dtype=np.float64)
+  
+  elif flags & 0b10: # NgSpice.is_complex()
+    # ngcomplex_t has the same memory layout as complex128, so view it directly
+    z = np.frombuffer((ngcomplex_t*length).from_address(address), dtype=np.complex128)
+    if name == 'frequency':
+      z = z.real
+    if copy:
+      z = z.copy()
+  
+  # Views of ngspice's own memory must not be written to
+  if not copy:
+    z.flags.writeable = False
+  return z
+
+# Vectors of a plot returned by NgSpice.get_data(), keyed by name
+class Plot(dict):
+  # Return all vectors as a single numpy record array with one field per vector (e.g. rec['V(1)']), which
+  # can be sliced along time/frequency as a whole. All vectors must have the same length. The data are
+  # copied once into the record array
+  def as_record(self):
+    names = list(self.keys())
+    if not names:
+      sys.stderr.write('An empty plot can\'t be converted into a record array\n')
+      raise ValueError
+    arrays = [np.atleast_1d(self[name]) for name in names]
+    if len(set(len(z) for z in arrays)) > 1:
+      sys.stderr.write('Vectors of different lengths can\'t be combined into a record array\n')
+      raise ValueError
+    return np.rec.fromarrays(arrays, names=names)
+
+# Plot returned by NgSpice.get_data(lazy=True). Vectors are converted into numpy arrays only when they are
+# first read, so unused vectors cost nothing. Read them before the next simulation, since they point to
+# ngspice's memory until then. Copying or pickling the plot converts all pending vectors and gives a Plot
+class LazyPlot(MutableMapping):
+  def __init__(self, copy=True):
+    self._copy = copy
+    self._vectors = {}   # Name -> array, or None while the vector is still pending
+    self._pending = {}   # Name -> (name, flags, length, address) of the vectors not converted yet
+  def _add_vector(self, vector_info):
+    self._pending[vector_info[0]] = vector_info
+    self._vectors[vector_info[0]] = None
+  def __getitem__(self, key):
+    if key in self._pending:
+      self._vectors[key] = _vector_to_array(self._pending.pop(key), self._copy)
+    return self._vectors[key]
   def __setitem__(self, key, item):
-    super(Dataset, self).__setitem__(key, item)
-    setattr(self, key, self[key])
+    self._pending.pop(key, None)
+    self._vectors[key] = item
+  def __delitem__(self, key):
+    self._pending.pop(key, None)
+    del self._vectors[key]
+  def __iter__(self):
+    return iter(self._vectors)
+  def __len__(self):
+    return len(self._vectors)
+  def __contains__(self, key):
+    return key in self._vectors
+  def __repr__(self):
+    return repr(self.copy())
+  def __reduce__(self):
+    return (Plot, (self.copy(),))
+  def copy(self):
+    return Plot(self.items())
+  as_record = Plot.as_record
+
+# Output stream used when NgSpice() gets none, discarding everything without opening os.devnull
+class _NullOut(object):
+  def write(self, *args):
+    pass
+  def flush(self):
+    pass
+
+# Keys like 'V(1)' or 'a#branch' can only be accessed as items, not as attributes
+def _is_attribute_name(key):
+  return isinstance(key, str) and key.isidentifier() and not keyword.iskeyword(key)
+
+# Dictionary whose keys can also be read as attributes, e.g. data.op1 instead of data['op1']. Attributes are
+# resolved on demand, so keys are stored only once and dict methods always take precedence
+class Dataset(dict):
+  def __getattr__(self, name):
+    # Special names are probed all the time by copy, pickle, numpy... and are never plot names
+    if name.startswith('__'):
+      raise AttributeError(name)
+    try:
+      return self[name]
+    except KeyError:
+      raise AttributeError(name)
+  def __dir__(self):
+    return dir(dict) + [key for key in self if _is_attribute_name(key)]
 
 # ########################################### NGSPICE INTERFACE ############################################### #
 
@@ -200,44 +401,60 @@ class NgSpice(object):
   
   def __init__(self, output=None):
     self._ng_out = None
-    self._external_sources = {}
+    self._external_sources = {}    # Keyed by the encoded name, as passed by ngspice to _GetSRCData
+    self._external_sources_vectorized = {}
+    self._external_sources_table = {}  # What _GetSRCData looks up: fun, or (dt, samples) when precomputed
+    self._tran = None
+    self._netlist_buf = None
+    self._klu = False
     self._thread_callback = lambda is_running, lib_id: 0
-    self._msg_queue = Queue()
+    self._msg_queue = deque()  # append() and popleft() are atomic, no need for a locked Queue
+    self._capture_output = False  # Only store ngspice's output in _msg_queue when something will read it
+    self._silent = output is None
     
     if (output is not None):
       self._ng_out = output
     elif  (self._ng_out is None):
-      self._ng_out = open(os.devnull, "w")      
+      self._ng_out = _NullOut()
+    
+    # Bound once here to save attribute lookups in the callbacks, which ngspice calls very often
+    self._ng_out_write = self._ng_out.write
+    self._msg_queue_append = self._msg_queue.append
+    self._get_external_source = self._external_sources_table.get
     
-    self.running_os = platform.system()
+    self.running_os = _RUNNING_OS
     
     try:
-      self.__lib_loader = {
-          'Windows' : dll.LoadLibrary,
-          'Linux'   : dll.LoadLibrary,
-          'FreeBSD' : dll.LoadLibrary}[self.running_os]
+      self.__lib_loader = _LIB_LOADERS[self.running_os]
     except:
       sys.stderr.write("Unknown operating system: %s\n" % self.running_os)
       raise OSError
     
-    try:
-      self.lib_path = list(filter(os.path.isfile, _LIB_PATHS[self.running_os]))[0]
-    except:
-      sys.stderr.write("No ngspice shared library found in any of the default locations: %s\n" % str(_LIB_PATHS))
-      raise FileNotFoundError
+    global _lib_path
+    if _lib_path is None:
+      try:
+        _lib_path = list(filter(os.path.isfile, _LIB_PATHS[self.running_os]))[0]
+      except:
+        sys.stderr.write("No ngspice shared library found in any of the default locations: %s\n" % str(_LIB_PATHS))
+        raise FileNotFoundError
+    self.lib_path = _lib_path
     
     self.__attach()
   
   def command(self, command):
     self._msg_queue_flush()
-    self._shared.ngSpice_Command(c_char_p(command.encode(_encoding)))
+    self._ng_command(command.encode(_encoding))
       
   def version(self):
-    self.command('version -f')
+    self._capture_output = True
+    try:
+      self.command('version -f')
+    finally:
+      self._capture_output = False
     ngspice, cider, xspice, openmp = [False]*4
     
-    while self._msg_queue.qsize():
-      s = self._msg_queue.get()
+    while self._msg_queue:
+      s = self._msg_queue.popleft()
       if 'ngspice-' in s:
         ngspice = s.split('-')[1].split(':')[0].strip() # stdout ** ngspice-27 : ....
       elif 'CIDER' in s:
@@ -255,30 +472,119 @@ class NgSpice(object):
           }
   
   def _msg_queue_flush(self):
-    while self._msg_queue.qsize():
-      self._msg_queue.get()    
+    self._msg_queue.clear()
           
         
-  def load_netlist(self, netlist):
+  def compile_netlist(self, netlist):
+    return CompiledNetlist(netlist)
+  
+  # Select KLU (enable=True) or Sparse1.3 (enable=False) as the matrix solver, for the loaded circuit and
+  # every circuit loaded afterwards. KLU is usually much faster on large circuits, but requires ngspice 34
+  # or later built with KLU support (the default since ngspice 37)
+  def use_klu(self, enable=True):
+    self._klu = enable
+    self.command('option klu' if enable else 'option sparse')
+  
+  def load_netlist(self, netlist, overrides=None):
+    ret = self.__load_netlist(netlist, overrides)
+    if self._klu and not ret:
+      self.command('option klu')
+    return ret
+  
+  def __load_netlist(self, netlist, overrides):
+    if overrides and not isinstance(netlist, CompiledNetlist):
+      sys.stderr.write('Overrides can only be applied to netlists compiled with NgSpice.compile_netlist()\n')
+      raise TypeError
+    
+    # Load a precompiled circuit, replacing the values of the elements in overrides
+    if isinstance(netlist, CompiledNetlist):
+      self._set_tran(netlist.tran)
+      changed = []
+      try:
+        for name, value in (overrides or {}).items():
+          changed.append(netlist._override(name, value))
+        return self._ng_circ(netlist.c_netlist)
+      finally:
+        for i in changed:
+          netlist._restore(i)
     
     # Load circuit as a file
-    if type(netlist)==str:
+    elif type(netlist)==str:
+      # Looking for .tran is only an optimization for vectorized sources, so it must never fail the load
+      if os.path.isfile(netlist):
+        try:
+          with open(netlist, 'r', encoding=_encoding, errors='replace') as f:
+            self._set_tran(_parse_tran(f))
+        except (IOError, OSError):
+          self._set_tran(None)
+      else:
+        self._set_tran(None)
       return self.command('source %s' % netlist)
     
     # Load circuit as an array (list) of strings
     else:
-      c_netlist = (c_char_p*(len(netlist)+1))()
-      for i, line in enumerate(netlist):
-        c_netlist[i] = c_char_p(line.encode(_encoding) + os.linesep.encode(_encoding))
-      c_netlist[-1] = c_char_p(None)
-      return self._shared.ngSpice_Circ(c_netlist)
+      self._set_tran(_parse_tran(netlist))
+      # Reuse the same buffer between calls, growing it only when a longer netlist comes in
+      if self._netlist_buf is None or len(self._netlist_buf) < len(netlist)+1:
+        self._netlist_buf = (c_char_p*(len(netlist)+1))()
+      c_netlist = self._netlist_buf
+      c_netlist[:len(netlist)] = [_encode_line(line) for line in netlist]
+      c_netlist[len(netlist)] = None
+      return self._ng_circ(c_netlist)
 
-  def add_external_source(self, name, fun):
+  # Change the value of an element of the loaded circuit (e.g. alter('r2', 1e3)) without parsing it again
+  def alter(self, name, value):
+    return self.command('alter %s = %s' % (name, value if isinstance(value, str) else '%e' % value))
+  
+  # If vectorized, fun must accept a numpy array of times. It will then be evaluated only once over the
+  # time grid of the .tran analysis (oversample points per time step) instead of once per ngspice call.
+  # Grids longer than _MAX_CACHE_SAMPLES are not precomputed, and fun is then called at every time point
+  def add_external_source(self, name, fun, vectorized=False, oversample=10):
+    name = name.encode(_encoding)
     self._external_sources[name] = fun
+    self._external_sources_table[name] = fun
+    if vectorized:
+      self._external_sources_vectorized[name] = oversample
+      self._cache_external_source(name)
+    else:
+      self._external_sources_vectorized.pop(name, None)
+  
+  # Registered external sources by name, as passed to add_external_source()
+  @property
+  def external_sources(self):
+    return dict((name.decode(_encoding), fun) for name, fun in self._external_sources.items())
+  
+  def _set_tran(self, tran):
+    if tran == self._tran:
+      return
+    self._tran = tran
+    for name in self._external_sources_vectorized:
+      self._external_sources_table[name] = self._external_sources[name]
+      self._cache_external_source(name)
+  
+  def _cache_external_source(self, name):
+    if self._tran is None:
+      return
+    tstep, tstop = self._tran
+    dt = tstep/self._external_sources_vectorized[name]
+    n_samples = int(tstop/dt) + 2
+    if n_samples > _MAX_CACHE_SAMPLES:
+      sys.stderr.write("Warning: External source \'%s\' would need %d samples (limit %d). "
+                       "It will be evaluated at every time point instead\n"
+                       % (name.decode(_encoding), n_samples, _MAX_CACHE_SAMPLES))
+      return
+    t = np.arange(n_samples)*dt
+    z = np.broadcast_to(self._external_sources[name](t), t.shape)
+    self._external_sources_table[name] = (dt, np.array(z, dtype=np.float64))
     
   def set_thread_callback(self, fun):
     self._thread_callback = fun
   
+  # Free all plots (except 'const') with their vectors, keeping the loaded library and circuit. Much cheaper
+  # than reset() to keep memory in check between runs
+  def clear_plots(self):
+    self.command('destroy all')
+  
   # Reload ngspice shared library. Use periodically to minimize leaks
   def reset(self):
     self.__detach()
@@ -290,19 +596,19 @@ class NgSpice(object):
   def bg_resume(self):
     self.command('bg_resume')
     
-  def bg_run(self, netlist=None):
-    return self.__run(netlist=netlist, background=True)
+  def bg_run(self, netlist=None, overrides=None):
+    return self.__run(netlist=netlist, overrides=overrides, background=True)
 
-  def run(self, netlist=None):
-    if self.__run(netlist=netlist, background=False):
+  def run(self, netlist=None, overrides=None, copy=True, lazy=False):
+    if self.__run(netlist=netlist, overrides=overrides, background=False):
       return {}
     else:
-      return self.get_data()
+      return self.get_data(copy=copy, lazy=lazy)
   
-  def __run(self, netlist, background):
+  def __run(self, netlist, overrides, background):
     command = 'bg_run' if background else 'run'
-    if netlist is not None:
-      if self.load_netlist(netlist):
+    if netlist is not None or overrides:
+      if self.load_netlist(netlist, overrides):
         sys.stderr.write('Error loading netlist. NgSpice.run() aborted\n')
         return 1
     
@@ -311,51 +617,103 @@ class NgSpice(object):
       return 1
 
  
-  def get_data(self):
-    plots = self._shared.ngSpice_AllPlots()
-  
-    i = 0
-    plot_names = []
-    while plots[i]!=None:
-      plot_names.append(plots[i])
-      i+= 1
+  # With copy=False vectors are returned as views of ngspice's own memory, which saves one copy per vector
+  # but is only valid until the next run(), load_netlist() or reset(). Consume or copy them before that.
+  # With lazy=True each plot is a LazyPlot and vectors are only converted the first time they are read,
+  # which also has to happen before the next simulation
+  def get_data(self, copy=True, lazy=False):
+    plot_names = tuple(_iter_cstr_array(self._ng_all_plots()))
+    
+    get_vec_info = self._ng_get_vec_info
+    all_vecs = self._ng_all_vecs
+    names = self._names
+    unit_type = _UNIT_TYPE
+    to_array = _vector_to_array
+    intern = sys.intern
     
     data = Dataset({})
     units = Dataset({})
     for plot_name in plot_names:
       
-      all_vectors = self._shared.ngSpice_AllVecs(c_char_p(plot_name))
-      i = 0
-      s_plot_name = plot_name.decode(_encoding)
-      data[s_plot_name] = {}
-      units[s_plot_name] = {}
+      all_vectors = tuple(_iter_cstr_array(all_vecs(plot_name)))
+      s_plot_name = names.get(plot_name)
+      if s_plot_name is None:
+        s_plot_name = names[plot_name] = intern(plot_name.decode(_encoding))
+      plot_data = data[s_plot_name] = LazyPlot(copy) if lazy else Plot()
+      plot_units = units[s_plot_name] = {}
+      add_vector = plot_data._add_vector if lazy else None
+      prefix = plot_name + b'.'
       
-      while all_vectors[i]!=None:
-        try:  # TODO: Figure out why this is needed for mixed simulations
-          vec = self._shared.ngGet_Vec_Info(c_char_p(plot_name+b'.'+all_vectors[i])).contents
-          vec_name = vec.v_name.decode(_encoding)
-          
-          if self.is_real(vec.v_flags):
-            z = np.ctypeslib.as_array(vec.v_realdata, (vec.v_length,))
-          
-          elif self.is_complex(vec.v_flags):
-            x_jy = np.ctypeslib.as_array(cast(vec.v_compdata, POINTER(c_double)), (2*vec.v_length,))
-            z = np.array(x_jy[0::2], dtype=np.complex64)
-            if vec_name != 'frequency':
-              z.imag = x_jy[1::2]
-            else:
-              z = z.real
-          
-          data[s_plot_name][vec_name] = z
-          units[s_plot_name][vec_name] = (_UNITS[vec.v_type], _TYPE[vec.v_type])
-        except:
-          pass
-        i+= 1
+      for vector in all_vectors:
+        # Some vectors of mixed (XSPICE) simulations come without info or data: skip them explicitly
+        p_vec = get_vec_info(prefix + vector)
+        if not p_vec:
+          continue
+        vec = p_vec.contents
+        flags = vec.v_flags
+        length = vec.v_length
+        
+        # ngGet_Vec_Info always fills the same structure, so keep the address of the data instead
+        if flags & 0b1:    # NgSpice.is_real()
+          address = cast(vec.v_realdata, c_void_p).value
+        elif flags & 0b10: # NgSpice.is_complex()
+          address = cast(vec.v_compdata, c_void_p).value
+        else:
+          continue
+        if address is None or length <= 0:
+          continue
+        
+        v_name = vec.v_name or vector
+        vec_name = names.get(v_name)
+        if vec_name is None:
+          vec_name = names[v_name] = intern(v_name.decode(_encoding))
+        vector_info = (vec_name, flags, length, address)
+        
+        if lazy:
+          add_vector(vector_info)
+        else:
+          plot_data[vec_name] = to_array(vector_info, copy)
+        v_type = vec.v_type
+        plot_units[vec_name] = unit_type[v_type] if 0 <= v_type < len(unit_type) else unit_type[0]
     
     return data, units
     
   def __attach(self):
     self._shared = self.__lib_loader(self.lib_path)
+    self._names = {}  # Plot and vector names decoded and interned once, keyed by their raw bytes
+    
+    # Declaring the prototypes lets ctypes convert arguments without guessing their types on every call
+    self._shared.ngSpice_Init.argtypes = [type(self._SendChar),
+                                          type(self._SendStat),
+                                          type(self._ControlledExit),
+                                          type(self._SendData),
+                                          type(self._SendInitData),
+                                          type(self._BGThreadRunning),
+                                          py_object]
+    self._shared.ngSpice_Init.restype = c_int
+    self._shared.ngSpice_Init_Sync.argtypes = [type(self._GetSRCData),
+                                               type(self._GetSRCData),
+                                               c_void_p,
+                                               POINTER(c_int),
+                                               c_void_p]
+    self._shared.ngSpice_Init_Sync.restype = c_int
+    self._shared.ngSpice_Command.argtypes = [c_char_p]
+    self._shared.ngSpice_Command.restype = c_int
+    self._shared.ngSpice_Circ.argtypes = [POINTER(c_char_p)]
+    self._shared.ngSpice_Circ.restype = c_int
+    self._shared.ngSpice_AllPlots.argtypes = []
+    self._shared.ngSpice_AllPlots.restype = POINTER(c_char_p)
+    self._shared.ngSpice_AllVecs.argtypes = [c_char_p]
+    self._shared.ngSpice_AllVecs.restype = POINTER(c_char_p)
+    self._shared.ngGet_Vec_Info.argtypes = [c_char_p]
+    self._shared.ngGet_Vec_Info.restype = POINTER(pvector_info)
+    
+    # Functions called after initialization, bound once per library load
+    self._ng_command = self._shared.ngSpice_Command
+    self._ng_circ = self._shared.ngSpice_Circ
+    self._ng_all_plots = self._shared.ngSpice_AllPlots
+    self._ng_all_vecs = self._shared.ngSpice_AllVecs
+    self._ng_get_vec_info = self._shared.ngGet_Vec_Info
     
     self._shared.ngSpice_Init(self._SendChar,
                               self._SendStat,
@@ -364,10 +722,6 @@ class NgSpice(object):
                               self._SendInitData,
                               self._BGThreadRunning,
                               py_object(self))
-    
-    self._shared.ngSpice_AllPlots.restype = POINTER(c_char_p)
-    self._shared.ngSpice_AllVecs.restype = POINTER(c_char_p)
-    self._shared.ngGet_Vec_Info.restype = POINTER(pvector_info)
     self._shared.ngSpice_Init_Sync(self._GetSRCData, self._GetSRCData, c_void_p(), pointer(c_int(0)), c_void_p())
 
   def __detach(self):
@@ -402,23 +756,29 @@ class NgSpice(object):
   @staticmethod
   @CFUNCTYPE(c_int, POINTER(c_double), c_double, c_char_p, c_int, py_object)
   def _GetSRCData(return_value, actual_time, node_name, lib_id, self): 
-    node_name = node_name.decode(_encoding)
-    if node_name in self._external_sources:
-      return_value[0] = self._external_sources[node_name](actual_time)
-      return 0 
-    else:
-      sys.stderr.write("Warning: Undefined external source \'%s\'. Returning 0 volts/amperes" % node_name)
-      self._external_sources[node_name] = lambda t : 0.0
+    source = self._get_external_source(node_name)
+    if source is None:
+      sys.stderr.write("Warning: Undefined external source \'%s\'. Returning 0 volts/amperes" % node_name.decode(_encoding))
+      self._external_sources[node_name] = self._external_sources_table[node_name] = lambda t : 0.0
       return_value[0] = 0.0
       return 1
+    elif type(source) is tuple:
+      dt, cache = source
+      return_value[0] = cache[min(int(actual_time/dt), len(cache)-1)]
+    else:
+      return_value[0] = source(actual_time)
+    return 0
   
   @staticmethod
   @CFUNCTYPE(c_int, c_char_p, c_int, py_object)
   def _SendChar(p_output, lib_id, self):
+    # Without an output stream there is nothing to do unless version() is parsing the output
+    if self._silent and not self._capture_output:
+      return 0
     msg = p_output.decode(_encoding)
-    self._msg_queue.put(msg) 
-    self._ng_out.write(msg)
-    self._ng_out.write('\n')
+    if self._capture_output:
+      self._msg_queue_append(msg)
+    self._ng_out_write(msg + '\n')
     return 0
     
   @staticmethod